@@ -391,14 +391,19 @@ class ClustGeoEdgeEncoder(torch.nn.Module):
             x1 = voxels[clusts.index_list[e[0]]]
             x2 = voxels[clusts.index_list[e[1]]]
 
-            # Find the closest set point in each cluster
+            # Find the closest set point in each cluster. The combined index
+            # is defined w.r.t. the lower cluster ID first
             if closest_index is None:
                 d12 = local_cdist(x1, x2)
                 imin = torch.argmin(d12)
+                i1, i2 = imin//len(x2), imin%len(x2)
             else:
                 imin = closest_index[e[0], e[1]]
+                if e[0] < e[1]:
+                    i1, i2 = imin//len(x2), imin%len(x2)
+                else:
+                    i2, i1 = imin//len(x1), imin%len(x1)
 
-            i1, i2 = imin//len(x2), imin%len(x2)
             v1 = x1[i1,:] # closest point in c1
             v2 = x2[i2,:] # closest point in c2
 
@@ -35,7 +35,7 @@ class GraphBase:
             Method used to compute inter-node distance ('voxel' or 'centroid')
         dist_algorithm : str, default 'brute'
             Algorithm used to comppute inter-node distance
-            ('brute' or 'recursive')
+            ('brute', 'recursive' or 'kdtree')
         """
         # Store attributes
         self.directed = directed
@@ -90,13 +90,20 @@ class GraphBase:
         np.ndarray
             (2, E) Tensor of edges
         """
-        # Generate the inter-cluster distsnce matrix, if needed
+        # Generate the inter-cluster distsnce matrix, if needed. If it is
+        # only used to restrict the edge length, skip the far cluster pairs
         dist_mat, closest_index = None, None
         if self.compute_dist:
+            max_dist = None
+            if (self.max_length is not None and
+                self.name not in ['mst', 'knn']):
+                max_dist = np.max(self.max_length)
+
             dist_mat, closest_index = inter_cluster_distance(
                     data.tensor[:, COORD_COLS], clusts.index_list,
                     clusts.counts, method=self.dist_method,
-                    algorithm=self.dist_algorithm, return_index=True)
+                    algorithm=self.dist_algorithm, return_index=True,
+                    max_dist=max_dist)
 
         # Generate the edge index
         edge_index, edge_counts = self.generate(
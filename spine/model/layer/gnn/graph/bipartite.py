@@ -55,31 +55,51 @@ class BipartiteGraph(GraphBase):
         -------
         np.ndarray
             (2, E) Tensor of edges
+        np.ndarray
+            (B) Number of edges in each entry of the batch
         """
-        # Get the primary status of each node
+        # Get the primary status of each node (any nonzero label, including
+        # the -1 label of particles with an unknown primary status)
         primaries = get_cluster_label(
-                data.tensor, clusts.index_list, column=PRINT_COL)
+                data.tensor, clusts.index_list, column=PRINT_COL) != 0
 
         return self._generate(
-                clusts.batch_ids, primaries, self.directed, self.directed_to)
+                clusts.counts, primaries, self.directed, self.directed_to)
 
+    @staticmethod
     @nb.njit(cache=True)
-    def bipartite_graph(batch_ids: nb.int64[:],
-                        primaries: nb.boolean[:],
-                        directed: nb.boolean = True,
-                        directed_to: str = 'secondary') -> nb.int64[:,:]:
+    def _generate(counts: nb.int64[:],
+                  primaries: nb.boolean[:],
+                  directed: bool = True,
+                  directed_to: str = 'secondary') -> (
+                          nb.int64[:,:], nb.int64[:]):
+        # Count the number of primary-secondary pairs in each entry
+        edge_counts = np.empty(len(counts), dtype=np.int64)
+        offset = 0
+        for b in range(len(counts)):
+            num_primaries = np.sum(primaries[offset:offset + counts[b]])
+            edge_counts[b] = num_primaries*(counts[b] - num_primaries)
+            offset += counts[b]
+
         # Create the incidence matrix
-        ret = np.empty((0,2), dtype=np.int64)
-        for i in np.where(primaries)[0]:
-            for j in np.where(~primaries)[0]:
-                if batch_ids[i] == batch_ids[j]:
-                    ret = np.vstack((ret, np.array([[i,j]])))
+        edge_index = np.empty((2, np.sum(edge_counts)), dtype=np.int64)
+        offset, index = 0, 0
+        for b in range(len(counts)):
+            primaries_b = primaries[offset:offset + counts[b]]
+            secondary_ids = offset + np.where(~primaries_b)[0]
+            num_secondaries = len(secondary_ids)
+            for i in offset + np.where(primaries_b)[0]:
+                edge_index[0, index:index + num_secondaries] = i
+                edge_index[1, index:index + num_secondaries] = secondary_ids
+                index += num_secondaries
+
+            offset += counts[b]
 
         # Handle directedness, by default graph is directed towards secondaries
         if directed:
             if directed_to == 'primary':
-                ret = ret[:,::-1]
+                edge_index = np.ascontiguousarray(edge_index[::-1])
             elif directed_to != 'secondary':
                 raise ValueError('Graph orientation not recognized')
 
-        return ret.T
+        return edge_index, edge_counts
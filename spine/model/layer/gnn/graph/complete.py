@@ -1,7 +1,6 @@
 """Complete graph constructor for GNNs."""
 
-import numpy as np
-import numba as nb
+from spine.utils.gnn.network import complete_graph
 
 from .base import GraphBase
 
@@ -35,25 +34,6 @@ class CompleteGraph(GraphBase):
         np.ndarray
             (B) Number of edges in each entry of the batch
         """
-        return self._generate(clusts.counts)
-
-    @staticmethod
-    @nb.njit(cache=True)
-    def _generate(counts: nb.int64[:]) -> (nb.int64[:,:], nb.int64[:]):
-        # Loop over the batches, define the adjacency matrix for each
-        edge_counts = counts*(counts - 1)//2
-        num_edges = np.sum(edge_counts)
-        edge_index = np.empty((2, num_edges), dtype=np.int64)
-        offset, index = 0, 0
-        for b in range(len(counts)):
-            # Build a list of edges
-            c = counts[b]
-            adj_mat = np.triu(np.ones((c, c)), k=1)
-            edges = np.vstack(np.where(adj_mat))
-            num_edges_b = edges.shape[1]
-
-            edge_index[:, index:index + num_edges_b] = offset + edges
-            index += num_edges_b
-            offset += c
-
-        return edge_index, edge_counts
+        edge_counts = clusts.counts*(clusts.counts - 1)//2
+
+        return complete_graph(clusts.counts), edge_counts
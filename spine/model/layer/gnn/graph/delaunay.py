@@ -1,5 +1,7 @@
 """Delaunay graph constructor for GNNs."""
 
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import numba as nb
 
@@ -23,6 +25,53 @@ class DelaunayGraph(GraphBase):
     """
     name = 'delaunay'
 
+    def __init__(self, num_workers=None, **kwargs):
+        """Initialize the graph constructor.
+
+        This adds the possibility to triangulate the entries of a batch
+        concurrently, using a pool of threads.
+
+        Parameters
+        ----------
+        num_workers : int, optional
+            Number of threads used to triangulate the entries of a batch
+            concurrently. If not specified, uses the default number of
+            threads of :class:`ThreadPoolExecutor`. If below 2, entries are
+            triangulated serially
+        **kwargs : dict, optional
+            Additional parameters to pass to the :class:`GraphBase` constructor.
+        """
+        # Initialize base class
+        super().__init__(**kwargs)
+
+        # Initialize the thread pool lazily, only if it is needed
+        self.num_workers = num_workers
+        self._executor = None
+
+    def __getstate__(self):
+        """Drops the thread pool when copying/pickling the constructor."""
+        state = self.__dict__.copy()
+        state['_executor'] = None
+
+        return state
+
+    @property
+    def executor(self):
+        """Pool of threads used to triangulate entries concurrently.
+
+        The pool is kept alive between calls to avoid starting new threads
+        at every forward pass.
+
+        Returns
+        -------
+        ThreadPoolExecutor
+            Pool of threads
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.num_workers)
+
+        return self._executor
+
     def generate(self, data, clusts, **kwargs):
         """Generates an incidence matrix that connects nodes
         that share an edge in their corresponding Euclidean Delaunay graph.
@@ -40,63 +89,81 @@ class DelaunayGraph(GraphBase):
         -------
         np.ndarray
             (2, E) Tensor of edges
+        np.ndarray
+            (B) Number of edges in each entry of the batch
         """
-        return self._generate(
-                data.tensor, nb.typed.List(clusts.index_list),
-                clusts.batch_ids, self.directed)
+        # Build the point cloud and the node labels of each entry
+        points, labels, entries = [], [], []
+        edge_counts = np.zeros(len(clusts.counts), dtype=np.int64)
+        index_list, offset = clusts.index_list, 0
+        for b, c in enumerate(clusts.counts):
+            # Skip entries in which there is nothing to connect
+            if c > 1:
+                index_b = index_list[offset:offset + c]
+                lengths = [len(idx) for idx in index_b]
+                index = np.concatenate(index_b)
+                points.append(data.tensor[index][:, COORD_COLS])
+                labels.append(np.repeat(np.arange(c), lengths))
+                entries.append((b, offset, c))
 
-    @staticmethod
-    @nb.njit(cache=True)
-    def _generate(data: nb.float64[:,:],
-                  clusts: nb.types.List(nb.int64[:]),
-                  batch_ids: nb.int64[:],
-                  directed: bool = False) -> nb.int64[:,:]:
-        # For each batch, find the list of edges, append it
-        edge_list, offset = [], 0
-        edge_counts = np.zeros(len(counts), dtype=counts.dtype)
-        for b in np.unique(batch_ids):
-            # Combine the cluster masks into one
-            clust_ids = np.where(batch_ids == b)[0]
-            limits = np.array([0] + [len(clusts[i]) for i in clust_ids])
-            limits = np.cumsum(limits)
-            mask = np.zeros(limits[-1], dtype=np.int64)
-            labels = np.zeros(limits[-1], dtype=np.int64)
-            for i in range(len(clust_ids)):
-                l, u = limits[i], limits[i+1]
-                mask[l:u] = clusts[clust_ids[i]]
-                labels[l:u] = i
-
-            # Run Delaunay triangulation in object mode because it relies on an
-            # external package. Only way to speed this up would be to implement
-            # Delaunay triangulation in Numba (tall order)
-            with nb.objmode(tri = 'int32[:,:]'): 
-                # Run Delaunay triangulation in joggled mode, this
-                # guarantees simplical faces (no ambiguities)
-                tri = Delaunay(data[mask][:, COORD_COLS], 
-                               qhull_options='QJ').simplices
-
-            # Create an adjanceny matrix from the simplex list
-            adj_mat = np.zeros((len(clust_ids),len(clust_ids)), dtype=np.bool_)
-            for s in tri:
-                for i in s:
-                    for j in s:
-                        if labels[j] > labels[i]:
-                            adj_mat[labels[i],labels[j]] = True
-
-            # Convert the adjancency matrix to a list of edges, store
-            edges = np.where(adj_mat)
-            edges = np.vstack((clust_ids[edges[0]], clust_ids[edges[1]]))
-
-            edge_list.append(offset + edge_index.T)
-            edge_counts[b] = edge_index.shape[-1]
             offset += c
 
+        # Run the triangulation of each entry in parallel. Qhull releases
+        # the GIL, so threads are sufficient to run them concurrently
+        parallel = self.num_workers is None or self.num_workers > 1
+        if parallel and len(points) > 1:
+            tris = list(self.executor.map(self._triangulate, points))
+        else:
+            tris = [self._triangulate(p) for p in points]
+
+        # Convert the simplices of each entry into a list of edges
+        edge_list = []
+        for tri, labels_b, (b, offset, c) in zip(tris, labels, entries):
+            edges = self._simplices_to_edges(tri, labels_b, c)
+            edge_list.append(offset + edges)
+            edge_counts[b] = edges.shape[1]
+
         # Merge the blocks together
-        offset = 0
-        result = np.empty((2, num_edges), dtype=np.int64)
-        for edges in edge_list:
-            num_block = edges.shape[-1]
-            result[:, offset:offset+num_block] = edges
-            offset += num_block
-
-        return result
+        if not len(edge_list):
+            return np.empty((2, 0), dtype=np.int64), edge_counts
+
+        return np.hstack(edge_list), edge_counts
+
+    @staticmethod
+    def _triangulate(points):
+        """Runs the Delaunay triangulation of a point cloud.
+
+        Parameters
+        ----------
+        points : np.ndarray
+            (N, 3) Point coordinates
+
+        Returns
+        -------
+        np.ndarray
+            (S, 4) List of simplices
+        """
+        # Run Delaunay triangulation in joggled mode, this
+        # guarantees simplical faces (no ambiguities)
+        return Delaunay(points, qhull_options='QJ').simplices
+
+    @staticmethod
+    @nb.njit(cache=True)
+    def _simplices_to_edges(tri: nb.int32[:,:],
+                            labels: nb.int64[:],
+                            num_nodes: nb.int64) -> nb.int64[:,:]:
+        # Create an adjanceny matrix from the simplex list
+        adj_mat = np.zeros((num_nodes, num_nodes), dtype=np.bool_)
+        for s in tri:
+            for i in s:
+                for j in s:
+                    if labels[j] > labels[i]:
+                        adj_mat[labels[i], labels[j]] = True
+
+        # Convert the adjancency matrix to a list of edges
+        edges = np.where(adj_mat)
+        edge_index = np.empty((2, len(edges[0])), dtype=np.int64)
+        edge_index[0] = edges[0]
+        edge_index[1] = edges[1]
+
+        return edge_index
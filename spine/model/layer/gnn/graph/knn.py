@@ -3,8 +3,6 @@
 import numpy as np
 import numba as nb
 
-import spine.utils.numba_local as nbl
-
 from .base import GraphBase
 
 __all__ = ['KNNGraph']
@@ -57,29 +55,38 @@ class KNNGraph(GraphBase):
         -------
         np.ndarray
             (2, E) Tensor of edges
+        np.ndarray
+            (B) Number of edges in each entry of the batch
         """
-        return self._generate(
-                clusts.batch_ids, self.k, dist_mat, self.directed)
+        return self._generate(clusts.counts, self.k, dist_mat)
 
     @staticmethod
     @nb.njit(cache=True)
-    def _generate(batch_ids: nb.int64[:],
+    def _generate(counts: nb.int64[:],
                   k: nb.int64,
-                  dist_mat: nb.float64[:,:],
-                  directed: bool = False) -> nb.int64[:,:]:
+                  dist_mat: nb.float64[:,:]) -> (nb.int64[:,:], nb.int64[:]):
+        # Each node is connected to min(k, c - 1) neighbors in its entry
+        edge_counts = np.empty(len(counts), dtype=np.int64)
+        for b in range(len(counts)):
+            edge_counts[b] = counts[b]*min(k, max(counts[b] - 1, 0))
+
         # Use the available distance matrix to build a kNN graph
-        ret = np.empty((0, 2), dtype=np.int64)
-        for b in np.unique(batch_ids):
-            clust_ids = np.where(batch_ids == b)[0]
-            if len(clust_ids) > 1:
-                subk = min(k+1, len(clust_ids))
-                submat = nbl.submatrix(dist_mat, clust_ids, clust_ids)
-                for i in range(len(submat)):
-                    idxs = np.argsort(submat[i])[1:subk]
-                    edges = np.empty((subk-1,2), dtype=np.int64)
-                    for j, idx in enumerate(np.sort(idxs)):
-                        edges[j] = [clust_ids[i], clust_ids[idx]]
-                    if len(edges):
-                        ret = np.vstack((ret, edges))
-
-        return ret.T
+        edge_index = np.empty((2, np.sum(edge_counts)), dtype=np.int64)
+        offset, index = 0, 0
+        for b in range(len(counts)):
+            c = counts[b]
+            if c > 1:
+                # Only a partial sort is needed to find the k closest nodes
+                subk = min(k, c - 1)
+                submat = dist_mat[offset:offset + c, offset:offset + c]
+                for i in range(c):
+                    dists = submat[i].copy()
+                    dists[i] = np.inf
+                    idxs = np.sort(np.argpartition(dists, subk - 1)[:subk])
+                    edge_index[0, index:index + subk] = offset + i
+                    edge_index[1, index:index + subk] = offset + idxs
+                    index += subk
+
+            offset += c
+
+        return edge_index, edge_counts
@@ -38,7 +38,7 @@ class LoopGraph(GraphBase):
         edge_counts = clusts.counts
 
         # Define the loop graph
-        num_nodes = np.sum(edge_counts)
-        edge_index = np.repeat(np.arange(num_nodes)[None, :], 2, axis=0)
+        nodes = np.arange(np.sum(edge_counts), dtype=np.int64)
+        edge_index = np.stack((nodes, nodes))
 
         return edge_index, edge_counts
@@ -3,8 +3,6 @@
 import numpy as np
 import numba as nb
 
-from scipy.sparse.csgraph import minimum_spanning_tree
-
 import spine.utils.numba_local as nbl
 
 from .base import GraphBase
@@ -12,7 +10,6 @@ from .base import GraphBase
 __all__ = ['MSTGraph']
 
 
-
 class MSTGraph(GraphBase):
     """Generates graphs based on the minimum-spanning tree (MST) of the input
     node locations.
@@ -41,28 +38,30 @@ class MSTGraph(GraphBase):
         -------
         np.ndarray
             (2, E) Tensor of edges
+        np.ndarray
+            (B) Number of edges in each entry of the batch
         """
-        return self._generate(clusts.batch_ids, dist_mat, self.directed)
+        return self._generate(clusts.counts, dist_mat)
 
     @staticmethod
     @nb.njit(cache=True)
-    def _generate(batch_ids: nb.int64[:],
-                  dist_mat: nb.float64[:,:],
-                  directed: bool = False) -> nb.int64[:,:]:
-        # For each batch, find the list of edges, append it
-        edge_list = []
-        num_edges = 0
-        ret = np.empty((0, 2), dtype=np.int64)
-        for b in np.unique(batch_ids):
-            clust_ids = np.where(batch_ids == b)[0]
-            if len(clust_ids) > 1:
-                submat = np.triu(nbl.submatrix(dist_mat, clust_ids, clust_ids))
-                # Suboptimal. Ideally want to reimplement in Numba, tall order.
-                with nb.objmode(mst_mat = 'float32[:,:]'): 
-                    mst_mat = minimum_spanning_tree(submat)
-                    mst_mat = mst_mat.toarray().astype(np.float32)
-                edges = np.where(mst_mat > 0.)
-                edges = np.vstack((clust_ids[edges[0]],clust_ids[edges[1]])).T
-                ret   = np.vstack((ret, edges))
+    def _generate(counts: nb.int64[:],
+                  dist_mat: nb.float64[:,:]) -> (nb.int64[:,:], nb.int64[:]):
+        # A spanning tree of c nodes has exactly c - 1 edges
+        edge_counts = np.maximum(counts - 1, 0)
+
+        # For each batch, find the list of edges, store it
+        edge_index = np.empty((2, np.sum(edge_counts)), dtype=np.int64)
+        offset, index = 0, 0
+        for b in range(len(counts)):
+            c = counts[b]
+            if c > 1:
+                submat = dist_mat[offset:offset + c, offset:offset + c]
+                edges = nbl.minimum_spanning_tree(submat)
+                edge_index[0, index:index + c - 1] = offset + edges[:, 0]
+                edge_index[1, index:index + c - 1] = offset + edges[:, 1]
+                index += c - 1
+
+            offset += c
 
-        return ret.T
+        return edge_index, edge_counts
@@ -74,4 +74,4 @@ def global_layer_factory(cfg, node_in, glob_in):
         Instantiated GNN global update layer
     """
     layer_dict = module_dict(layer, pattern='Global')
-    return instantiate(layer_dict, cfg, node_in=node_in, edge_in=edge_in)
+    return instantiate(layer_dict, cfg, node_in=node_in, glob_in=glob_in)
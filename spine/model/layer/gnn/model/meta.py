@@ -1,5 +1,6 @@
 """Module which contains a generic GNN message passing implementation."""
 
+import torch
 from torch import nn
 from torch_geometric.nn import MetaLayer
 
@@ -9,6 +10,7 @@ from spine.model.layer.common.act_norm import norm_factory
 
 from .factories import (
         edge_layer_factory, node_layer_factory, global_layer_factory)
+from .layer import MLPEdgeLayer, MLPNodeLayer, MLPGlobalLayer
 
 __all__ = ['MetaLayerGNN']
 
@@ -19,7 +21,9 @@ class MetaLayerGNN(nn.Module):
 
     def __init__(self, node_feats=0, node_layer=None, edge_feats=0,
                  edge_layer=None, global_feats=0, global_layer=None,
-                 num_mp=3, input_normalization='batch_norm'):
+                 num_mp=3, input_normalization='batch_norm',
+                 torch_compile=False, compile_mode='default',
+                 autocast=False, autocast_dtype='bfloat16'):
         """Initializes the message passing network.
 
         Parameters
@@ -40,6 +44,19 @@ class MetaLayerGNN(nn.Module):
             Number of message passing steps (node/edge/global feature updates)
         input_normalization : union[str, dict], default 'batch_norm'
             Input node/edge/global feature ormalization function configuration
+        torch_compile : bool, default False
+            If `True`, compile the message passing steps with `torch.compile`.
+            This fuses the many small kernels launched at each step
+        compile_mode : str, default 'default'
+            Compilation mode passed to `torch.compile`. The 'reduce-overhead'
+            mode records CUDA graphs for each new number of nodes/edges,
+            i.e. for almost every batch, it is not recommended
+        autocast : bool, default False
+            If `True`, run the message passing steps in reduced precision
+            using `torch.autocast`. The input normalization layers and the
+            output features are kept in single precision
+        autocast_dtype : str, default 'bfloat16'
+            Reduced precision data type ('bfloat16' or 'float16')
         """
         # Initialize the parent class
         super().__init__()
@@ -50,6 +67,10 @@ class MetaLayerGNN(nn.Module):
         self.global_feats = global_feats
         self.num_mp       = num_mp
 
+        # Store the mixed precision parameters
+        self.autocast = autocast
+        self.autocast_dtype = getattr(torch, autocast_dtype)
+
         # Intialize the input normalization layers
         self.node_bn, self.edge_bn, self.global_bn = None, None, None
         if node_feats > 0:
@@ -59,6 +80,11 @@ class MetaLayerGNN(nn.Module):
         if global_feats > 0:
             self.global_bn = norm_factory(input_normalization, global_feats)
 
+        # Drop pass-through normalization layers, no need to dispatch them
+        for key in ('node_bn', 'edge_bn', 'global_bn'):
+            if isinstance(getattr(self, key), nn.Identity):
+                setattr(self, key, None)
+
         # Loop over the number of message passing steps, initialize the
         # metalayer which updates the features at each step
         self.mp_layers = nn.ModuleList()
@@ -95,6 +121,42 @@ class MetaLayerGNN(nn.Module):
         self.edge_feature_size = edge_nf
         self.global_feature_size = glob_nf
 
+        # Store the compilation parameters, compile on first use
+        self.torch_compile = torch_compile
+        self.compile_mode = compile_mode
+        self._compiled_message_passing = None
+
+    def __getstate__(self):
+        """Drops the compiled message passing steps when copying/pickling
+        the model, they are compiled again on first use."""
+        state = super().__getstate__()
+        state['_compiled_message_passing'] = None
+
+        return state
+
+    @property
+    def message_passing_fn(self):
+        """Function which runs the message passing steps.
+
+        If requested, the message passing steps are compiled on first use. The
+        number of nodes and edges varies from batch to batch, so the function
+        is compiled with dynamic shapes.
+
+        Returns
+        -------
+        callable
+            Message passing function
+        """
+        if not self.torch_compile:
+            return self.message_passing
+
+        if self._compiled_message_passing is None:
+            self._compiled_message_passing = torch.compile(
+                    self.message_passing, mode=self.compile_mode,
+                    dynamic=True)
+
+        return self._compiled_message_passing
+
     def forward(self, node_feats, edge_index, edge_feats, glob_feats, batch):
         """Run the message passing steps on one batch of data.
 
@@ -114,7 +176,7 @@ class MetaLayerGNN(nn.Module):
         # Pass input through the input normalization layer
         x, e, u = node_feats.tensor, None, None
         if self.node_bn is not None:
-            x = self.node_bn(node_feats.tensor)
+            x = self.node_bn(x)
         if edge_feats is not None:
             e = edge_feats.tensor
             if self.edge_bn is not None:
@@ -124,9 +186,15 @@ class MetaLayerGNN(nn.Module):
             if self.global_bn is not None:
                 u = self.global_bn(u)
 
-        # Loop over the message passing steps, update the graph features
-        for l in range(self.num_mp):
-            x, e, u = self.mp_layers[l](x, edge_index, e, u, batch)
+        # Run the message passing steps, in reduced precision if requested
+        with torch.autocast(device_type=x.device.type,
+                            dtype=self.autocast_dtype, enabled=self.autocast):
+            x, e, u = self.message_passing_fn(x, edge_index, e, u, batch)
+
+        # Bring the output features back to single precision
+        if self.autocast:
+            x, e, u = [
+                    t.float() if t is not None else None for t in (x, e, u)]
 
         # Initialize and return result dictionary
         result = {}
@@ -135,6 +203,120 @@ class MetaLayerGNN(nn.Module):
         if self.mp_layers[0].edge_model is not None:
             result['edge_features'] = TensorBatch(e, edge_feats.counts)
         if self.mp_layers[0].global_model is not None:
-            result['global_features'] = TensorBatch(u, global_feats.counts)
+            result['global_features'] = TensorBatch(u, glob_feats.counts)
 
         return result
+
+    def message_passing(self, x, edge_index, e, u, batch):
+        """Loop over the message passing steps, update the graph features.
+
+        Parameters
+        ----------
+        x : torch.Tensor
+            (C, N_c) Node features
+        edge_index : torch.Tensor
+            (2, E) Incidence matrix
+        e : torch.Tensor
+            (E, N_e) Edge features
+        u : torch.Tensor
+            (B, N_g) Global features
+        batch : torch.Tensor
+            (C) Batch ID of each node in the batched graph
+
+        Returns
+        -------
+        torch.Tensor
+            (C, N_c') Updated node features
+        torch.Tensor
+            (E, N_e') Updated edge features
+        torch.Tensor
+            (B, N_g') Updated global features
+        """
+        for l in range(self.num_mp):
+            x, e, u = self.mp_layers[l](x, edge_index, e, u, batch)
+
+        return x, e, u
+
+    @torch.no_grad()
+    def fuse(self):
+        """Folds the input batch normalization layers into the first linear
+        layer of the MLPs which consume the normalized features in the first
+        message passing step.
+
+        This saves one pass over the input features at inference time. It
+        relies on the running statistics of the normalization layers, so it
+        must only be called on a model in evaluation mode, before inference.
+        A normalization layer is left untouched if one of its consumers is
+        not an MLP update layer, or if the features it normalizes are not
+        updated by the first step (and hence consumed by later steps too).
+        """
+        # Check that the model is in evaluation mode
+        assert not self.training, (
+                "Can only fuse normalization layers in evaluation mode.")
+
+        # Can only fold into MLP update layers, the node update is required
+        edge_model, node_model, global_model = (
+                self.mp_layers[0].edge_model, self.mp_layers[0].node_model,
+                self.mp_layers[0].global_model)
+        if node_model is None:
+            return
+        for model in (edge_model, node_model, global_model):
+            if (model is not None and not isinstance(
+                    model, (MLPEdgeLayer, MLPNodeLayer, MLPGlobalLayer))):
+                return
+
+        # List the linear layers (and column offsets) consuming each input
+        node_nf, edge_nf = self.node_feats, self.edge_feats
+        message_mlp = node_model.message_mlp.model[0]
+        aggr_mlp = node_model.aggr_mlp.model[0]
+        consumers = {'node_bn': [(message_mlp, 0), (aggr_mlp, 0)]}
+        if edge_model is not None:
+            edge_mlp = edge_model.mlp.model[0]
+            consumers['node_bn'] += [(edge_mlp, 0), (edge_mlp, node_nf)]
+            consumers['edge_bn'] = [(edge_mlp, 2*node_nf)]
+
+        if global_model is not None:
+            message_nf = node_model.message_mlp.feature_size
+            consumers['global_bn'] = [
+                    (aggr_mlp, node_nf + message_nf),
+                    (global_model.mlp.model[0], node_model.feature_size)]
+            if edge_model is not None:
+                consumers['global_bn'].append(
+                        (edge_mlp, 2*node_nf + edge_nf))
+
+        # Fold the normalization layers
+        for key, linears in consumers.items():
+            bn = getattr(self, key)
+            if (isinstance(bn, nn.BatchNorm1d) and
+                bn.track_running_stats and
+                all(isinstance(l, nn.Linear) for l, _ in linears)):
+                _fold_batch_norm(bn, linears)
+                setattr(self, key, None)
+
+
+def _fold_batch_norm(bn, linears):
+    """Folds a batch normalization layer into linear layers which consume the
+    normalized features as a contiguous block of their input columns.
+
+    Parameters
+    ----------
+    bn : nn.BatchNorm1d
+        Batch normalization layer
+    linears : List[Tuple[nn.Linear, int]]
+        List of (linear layer, first input column of the block) pairs
+    """
+    # Express the normalization as an affine transformation
+    scale = 1./torch.sqrt(bn.running_var + bn.eps)
+    shift = -bn.running_mean*scale
+    if bn.affine:
+        scale = scale*bn.weight
+        shift = shift*bn.weight + bn.bias
+
+    # Fold it into the weights and biases of the linear layers
+    for linear, offset in linears:
+        weight = linear.weight[:, offset:offset + len(scale)]
+        if linear.bias is None:
+            linear.bias = nn.Parameter(weight @ shift)
+        else:
+            linear.bias += weight @ shift
+        weight *= scale
@@ -187,6 +187,26 @@ class PostBase(ABC):
         # Run the post-processor
         return self.process(data_filter)
 
+    def run_batch(self, data, num_entries):
+        """Calls the post processor on every entry of a batch.
+
+        By default, the entries are processed serially. Post-processors which
+        can process entries concurrently may override this method.
+
+        Parameters
+        ----------
+        data : dict
+            Dicitionary of data products
+        num_entries : int
+            Number of entries in the batch
+
+        Returns
+        -------
+        List[dict]
+            Update to the input dictionary, one per entry
+        """
+        return [self(data, entry) for entry in range(num_entries)]
+
     def get_index(self, obj):
         """Get a certain pre-defined index attribute of an object.
 
@@ -1,96 +1,251 @@
+"""CRT-TPC matching post-processor."""
+
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+from spine.utils.globals import MUON_PID
+
 from spine.post.base import PostBase
 
+from .matcher import CRTTPCManager
+
 __all__ = ['CRTMatchProcessor']
 
 
 class CRTMatchProcessor(PostBase):
-    '''
-    Associates TPC interactions with optical flashes.
-    '''
-    name = 'run_crt_tpc_matching'
-    data_cap = ['crthits']
-    result_cap = ['interactions'] # TODO: Should be done at particle level
-
-    def __init__(self,
-                 crthit_keys,
+    """Associates TPC interactions with CRT hits."""
+    name = 'crt_match'
+    aliases = ['run_crt_tpc_matching']
+
+    def __init__(self, crthit_keys, run_mode='reco', num_workers=0,
                  **kwargs):
-        '''
-        Post processor for running CRT-TPC matching using matcha.
-        
+        """Post processor for running CRT-TPC matching using matcha.
+
         Parameters
         ----------
         crthit_keys : List[str]
             List of keys that provide the CRT information in the data dictionary
+        run_mode : str, default 'reco'
+            Which interactions to match ('reco', 'truth', 'both' or 'all')
+        num_workers : int, default 0
+            Number of worker processes used to run the matching of the entries
+            of a batch concurrently. If below 2, entries are matched serially.
+            Cannot be used when the matches are saved to file, as all workers
+            would write to the same `file_path`
         **kwargs : dict
             Keyword arguments to pass to the CRT-TPC matching algorithm
-        '''
+        """
+        # Initialize the parent class
+        super().__init__('interaction', run_mode)
+
         # Store the relevant attributes
+        assert len(crthit_keys) > 0, "Must provide at least one CRT hit key."
         self.crthit_keys = crthit_keys
+        for key in self.crthit_keys:
+            self.keys[key] = True
+
+        # Initialize the CRT-TPC matching manager
+        self.crt_tpc_config = kwargs
+        self.crt_tpc_manager = CRTTPCManager(None, self.crt_tpc_config)
+
+        # Initialize the worker pool lazily, only if it is needed
+        assert num_workers < 2 or not self.crt_tpc_manager.save_to_file, (
+                "Cannot match entries in parallel when saving the matches "
+                "to file, as all workers would write to the same file.")
+        self.num_workers = num_workers
+        self._executor = None
+
+    def __del__(self):
+        """Shuts down the worker pool, if it was ever started.
+
+        This does not wait on the workers, as blocking in a finalizer may
+        deadlock at interpreter teardown.
+        """
+        self.close(wait=False)
+
+    @property
+    def executor(self):
+        """Pool of worker processes used to match entries concurrently.
 
-    def process(self, data_dict, result_dict):
-        '''
-        Find [interaction, flash] pairs
+        The `forkserver` start method is used to avoid forking the (possibly
+        large) state of the parent process.
+
+        Returns
+        -------
+        ProcessPoolExecutor
+            Pool of worker processes
+        """
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                    max_workers=self.num_workers,
+                    mp_context=mp.get_context('forkserver'))
+
+        return self._executor
+
+    def close(self, wait=True):
+        """Shuts down the worker pool, if it was ever started.
+
+        The pool is started again on the next call to :meth:`run_batch`
+        which needs it.
 
         Parameters
         ----------
-        data_dict : dict
-            Input data dictionary
-        result_dict : dict
-            Chain output dictionary
+        wait : bool, default True
+            If `True`, wait for the pending matching jobs to complete.
+            Otherwise, cancel them and return immediately
+        """
+        if getattr(self, '_executor', None) is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
+
+    def process(self, data):
+        """Find [interaction, CRT hit] pairs in one entry.
+
+        Parameters
+        ----------
+        data : dict
+            Dictionary of data products
 
         Notes
         -----
-        This post-processor also modifies the list of Interactions
+        This post-processor modifies the list of `interaction` objects
         in-place by adding the following attributes:
-            interaction.crthit_matched: (bool)
-                Indicator for whether the given interaction has a CRT-TPC match
-            interaction.crthit_id: (list of ints)
-                List of IDs for CRT hits that were matched to one or more tracks
-        '''
-        crthits = {}
-        assert len(self.crthit_keys) > 0
-        for key in self.crthit_keys:
-            crthits[key] = data_dict[key]
-        
-        interactions = result_dict['interactions']
-        
-        crt_tpc_matches = crt_tpc_manager.get_crt_tpc_matches(int(entry), 
-                                                              interactions,
-                                                              crthits,
-                                                              use_true_tpc_objects=False,
-                                                              restrict_interactions=[])
-
-        from matcha.match_candidate import MatchCandidate
-        assert all(isinstance(item, MatchCandidate) for item in crt_tpc_matches)
-
-        # crt_tpc_matches is a list of matcha.MatchCandidates. Each MatchCandidate
-        # contains a Track and CRTHit instance. The Track class contains the 
-        # interaction_id.
-        #matched_interaction_ids = [int_id for int_id in crt_tpc_matches.track.interaction_id]
-        #matched_interaction_ids = []
-        #for match in crt_tpc_matches:
-        #    matched_interaction_ids.append(match.track.interaction_id)
-        #
-        #matched_interactions = [i for i in interactions 
-        #                        if i.id in matched_interaction_ids]
-
-
-        for match in crt_tpc_matches:
-            matched_track = match.track
-            # To modify the interaction in place, we need to find it in the interactions list
-            matched_interaction = None
-            for interaction in interactions:
-                if matched_track.interaction_id == interaction.id:
-                    matched_interaction = interaction
-                    break
-            matched_crthit = match.crthit
+        - interaction.crthit_matched: (bool)
+               Indicator for whether the given interaction has a CRT-TPC match
+        - interaction.crthit_matched_particle_id: (int)
+               ID of the particle which was matched to a CRT hit
+        - interaction.crthit_id: (int)
+               ID of the CRT hit that was matched to the interaction
+        """
+        # Convert the CRT hits to matcha objects
+        crthits = self.crt_tpc_manager.make_crthit(
+                [data[key] for key in self.crthit_keys])
+
+        # Loop over the interaction keys to match
+        for k in self.interaction_keys:
+            interactions = data[k]
+            tracks = self.get_tracks(interactions)
+            matches = self.crt_tpc_manager.run_crt_tpc_matching(
+                    tracks, crthits)
+            self.store_matches(interactions, matches)
+
+    def run_batch(self, data, num_entries):
+        """Find [interaction, CRT hit] pairs in every entry of a batch.
+
+        The matcha inputs are built in the main process, the matching of
+        each entry is dispatched to a pool of worker processes and the
+        matches are stored in-place on the interactions of the main process.
+
+        Parameters
+        ----------
+        data : dict
+            Dictionary of data products
+        num_entries : int
+            Number of entries in the batch
+
+        Returns
+        -------
+        List[None]
+            No update to the input dictionary, one per entry
+        """
+        # If there is no worker pool to use, process the entries serially
+        if self.num_workers < 2 or num_entries < 2:
+            return super().run_batch(data, num_entries)
+
+        # Check that the essential inputs are provided
+        for key, req in self.keys.items():
+            assert not req or key in data, (
+                    f"Post-processor `{self.name}` is missing an essential "
+                    f"input to be used: `{key}`.")
+
+        # Build the matcha inputs of each entry
+        jobs, tracks, crthits = [], [], []
+        for entry in range(num_entries):
+            crthits_e = self.crt_tpc_manager.make_crthit(
+                    [data[key][entry] for key in self.crthit_keys])
+            for k in self.interaction_keys:
+                jobs.append((k, entry))
+                tracks.append(self.get_tracks(data[k][entry]))
+                crthits.append(crthits_e)
+
+        # Run the matching of each entry in a worker process
+        configs = [self.crt_tpc_config]*len(jobs)
+        matches = self.executor.map(_run_matching, configs, tracks, crthits)
+
+        # Store the matches
+        for (k, entry), matches_e in zip(jobs, matches):
+            self.store_matches(data[k][entry], matches_e)
+
+        return [None]*num_entries
+
+    def get_tracks(self, interactions):
+        """Converts the uncontained track-like particles of a list of
+        interactions to matcha tracks.
+
+        Parameters
+        ----------
+        interactions : List[Union[RecoInteraction, TruthInteraction]]
+            List of interactions in one entry
+
+        Returns
+        -------
+        List[matcha.Track]
+            List of matcha tracks
+        """
+        muon_candidates = [
+                part for inter in interactions for part in inter.particles
+                if part.pid >= MUON_PID and not part.is_contained]
+
+        return self.crt_tpc_manager.make_tpctrack(muon_candidates)
+
+    @staticmethod
+    def store_matches(interactions, matches):
+        """Stores the CRT hit matches on the interactions they belong to.
+
+        Parameters
+        ----------
+        interactions : List[Union[RecoInteraction, TruthInteraction]]
+            List of interactions in one entry
+        matches : List[matcha.MatchCandidate]
+            List of track-CRT hit matches. Each track carries the ID of the
+            interaction it belongs to
+        """
+        # To modify the interactions in place, map their IDs onto them
+        lookup = {inter.id: inter for inter in interactions}
+        for match in matches:
             # Sanity check
-            if matched_interaction is None: continue
+            matched_track = match.track
+            matched_interaction = lookup.get(matched_track.interaction_id)
+            if matched_interaction is None:
+                continue
+
             matched_interaction.crthit_matched = True
             matched_interaction.crthit_matched_particle_id = matched_track.id
-            matched_interaction.crthit_id = matched_crthit.id
+            matched_interaction.crthit_id = match.crthit.id
+
+
+def _run_matching(crt_tpc_config, tracks, crthits):
+    """Runs the CRT-TPC matching of one entry.
+
+    This is defined at the module level so that it can be dispatched to a
+    worker process. Its inputs and outputs are picklable matcha objects. The
+    tracks carry the points and depositions of their particles, which are
+    needed to estimate their directions, so they are pickled along with them.
+
+    Parameters
+    ----------
+    crt_tpc_config : dict
+        CRT-TPC matching configuration
+    tracks : List[matcha.Track]
+        List of matcha tracks
+    crthits : List[matcha.CRTHit]
+        List of matcha CRT hits
 
-            # update_dict['interactions'].append(matched_interaction)
-        # update_dict['crt_tpc_matches'].append(crt_tpc_dict)
+    Returns
+    -------
+    List[matcha.MatchCandidate]
+        List of track-CRT hit matches
+    """
+    manager = CRTTPCManager(None, crt_tpc_config)
 
-        return {}, {}
+    return manager.run_crt_tpc_matching(tracks, crthits)
@@ -64,8 +64,7 @@ class PostManager:
             else:
                 num_entries = len(data['index'])
                 result = defaultdict(list)
-                for entry in range(num_entries):
-                    result_e = module(data, entry)
+                for result_e in module.run_batch(data, num_entries):
                     if result_e is not None:
                         for k, v in result_e.items():
                            result[k].append(v)
@@ -403,7 +403,7 @@ def _get_cluster_centers(data: nb.float64[:,:],
     return centers
 
 
-@numbafy(cast_args=['data'], list_args=['clusts'])
+@numbafy(cast_args=['data'])
 def get_cluster_sizes(data, clusts):
     """Returns the sizes of each cluster.
 
@@ -419,20 +419,8 @@ def get_cluster_sizes(data, clusts):
     np.ndarray
         (C) List of cluster sizes
     """
-    if not len(clusts):
-        return np.empty(0, dtype=np.int64)
-
-    return _get_cluster_sizes(data, clusts)
-
-@nb.njit(cache=True)
-def _get_cluster_sizes(data: nb.float64[:,:],
-                       clusts: nb.types.List(nb.int64[:])) -> nb.int64[:]:
-
-    sizes = np.empty(len(clusts), dtype=np.int64)
-    for i, c in enumerate(clusts):
-        sizes[i] = len(c)
-
-    return sizes
+    # No need for a typed list and a compiled loop to get the lengths
+    return np.array([len(c) for c in clusts], dtype=np.int64)
 
 
 @numbafy(cast_args=['data'], list_args=['clusts'],
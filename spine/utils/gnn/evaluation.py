@@ -837,9 +837,7 @@ def voxel_efficiency_bipartite(clusts, node_assn, node_pred, primaries):
     return int_vox / tot_vox
 
 
-@nb.njit(cache=True)
-def cluster_to_voxel_label(clusts: nb.types.List(nb.int64[:]),
-                           node_labels: nb.int64[:]) -> nb.int64[:]:
+def cluster_to_voxel_label(clusts, node_labels):
     """Turns a list of labels on clusters to an array of labels on voxels.
 
     Parameters
@@ -854,6 +852,6 @@ def cluster_to_voxel_label(clusts: nb.types.List(nb.int64[:]),
     np.ndarray
         (N) Voxel labels
     """
-    counts = [len(c) for c in clusts]
+    counts = np.array([len(c) for c in clusts], dtype=np.int64)
 
     return np.repeat(node_labels, counts)
@@ -508,6 +508,52 @@ def union_find(edge_index: nb.int64[:,:],
     return labels
 
 
+@nb.njit(cache=True)
+def minimum_spanning_tree(dist_mat: nb.float32[:,:]) -> nb.int64[:,:]:
+    """Numba implementation of Prim's algorithm on a dense distance matrix.
+
+    Parameters
+    ----------
+    dist_mat : np.ndarray
+        (N, N) Symmetric matrix of pair-wise distances between nodes
+
+    Returns
+    -------
+    np.ndarray
+        (N-1, 2) List of tree edges [i, j] with i < j, sorted lexicographically
+    """
+    # Initialize the tree with the first node
+    num_nodes = len(dist_mat)
+    edges = np.empty((max(num_nodes - 1, 0), 2), dtype=np.int64)
+    if num_nodes < 2:
+        return edges
+
+    in_tree = np.zeros(num_nodes, dtype=np.bool_)
+    key = dist_mat[0].astype(np.float64)
+    parent = np.zeros(num_nodes, dtype=np.int64)
+    in_tree[0] = True
+
+    # Add the node closest to the tree, update the distances to the tree
+    for e in range(num_nodes - 1):
+        best = -1
+        for j in range(num_nodes):
+            if not in_tree[j] and (best < 0 or key[j] < key[best]):
+                best = j
+
+        in_tree[best] = True
+        edges[e, 0] = min(parent[best], best)
+        edges[e, 1] = max(parent[best], best)
+        for j in range(num_nodes):
+            if not in_tree[j] and dist_mat[best, j] < key[j]:
+                key[j] = dist_mat[best, j]
+                parent[j] = best
+
+    # Sort the edges
+    order = np.argsort(edges[:, 0]*num_nodes + edges[:, 1])
+
+    return edges[order]
+
+
 @nb.njit(cache=True)
 def dbscan(x: nb.float32[:, :],
            eps: nb.float32,
@@ -622,7 +668,7 @@ def closest_pair(x1: nb.float32[:,:],
     from two separate sets.
 
     Two algorithms:
-    - `brute`: compute cdist, use argmin
+    - `brute`: scan every pair, keep track of the closest one
     - `recursive`: Start with one point in one set, find the closest
                    point in the other set, move to theat point, repeat. This
                    algorithm is *not* exact, but a good and very quick proxy.
@@ -649,13 +695,19 @@ def closest_pair(x1: nb.float32[:,:],
     """
     # Find the two points in two sets of points that are closest to each other
     if algorithm == 'brute':
-        # Compute every pair-wise distances between the two sets
-        dist_mat = cdist(x1, x2)
-
-        # Select the closest pair of point
-        index = np.argmin(dist_mat)
-        idxs = [index//dist_mat.shape[1], index%dist_mat.shape[1]]
-        dist = dist_mat[idxs[0], idxs[1]]
+        # Stream through every pair of points, keep the closest one. This
+        # avoids materializing the full (N, M) distance matrix
+        idxs, dist = [0, 0], np.inf
+        for i1 in range(x1.shape[0]):
+            for i2 in range(x2.shape[0]):
+                dist_sq = 0.
+                for d in range(x1.shape[1]):
+                    dist_sq += (x1[i1, d] - x2[i2, d])**2
+                if dist_sq < dist:
+                    idxs[0], idxs[1], dist = i1, i2, dist_sq
+
+        # Only take the square root of the smallest squared distance
+        dist = np.sqrt(dist)
 
     elif algorithm == 'recursive':
         # Pick the point to start iterating from
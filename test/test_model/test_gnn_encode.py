@@ -0,0 +1,49 @@
+"""Test that the GNN feature encoders work as intended."""
+
+import pytest
+
+import numpy as np
+import torch
+
+from spine.data import TensorBatch, IndexBatch, EdgeIndexBatch
+from spine.utils.globals import COORD_COLS
+from spine.utils.gnn.network import inter_cluster_distance
+from spine.model.layer.gnn.encode.geometric import ClustGeoEdgeEncoder
+
+
+@pytest.mark.parametrize('use_closest_index', [False, True])
+def test_geo_edge_encoder(use_closest_index):
+    """Tests that the NumPy and torch backends of the geometric edge encoder
+    produce the same features, for edges oriented both ways."""
+    # Set the random seed so that there are no surprises
+    np.random.seed(seed=0)
+
+    # Generate a single entry of random clusters
+    sizes = np.random.randint(3, 10, size=6)
+    data = np.zeros((np.sum(sizes), 5), dtype=np.float32)
+    data[:, COORD_COLS] = 20*np.random.rand(np.sum(sizes), 3)
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    clusts = [np.arange(offsets[i], offsets[i + 1]) for i in range(len(sizes))]
+
+    data = TensorBatch(torch.tensor(data), [len(data)])
+    clusts = IndexBatch(clusts, [0], [len(clusts)], sizes)
+
+    # Build a directed graph with edges pointing both ways
+    edge_index = np.array([[0, 2, 5, 1, 3, 4],
+                           [1, 0, 2, 4, 5, 3]])
+    edge_index = EdgeIndexBatch(edge_index, [6], [0], directed=True)
+
+    # Compute the closest voxel pair of each cluster pair, if requested
+    closest_index = None
+    if use_closest_index:
+        _, closest_index = inter_cluster_distance(
+                data.tensor[:, COORD_COLS].numpy(), clusts.index_list,
+                return_index=True)
+
+    # Check that both backends agree
+    feats = ClustGeoEdgeEncoder(use_numpy=True)(
+            data, clusts, edge_index, closest_index=closest_index).tensor
+    feats_torch = ClustGeoEdgeEncoder(use_numpy=False)(
+            data, clusts, edge_index, closest_index=closest_index).tensor
+
+    torch.testing.assert_close(feats_torch, feats, rtol=1e-5, atol=1e-5)
@@ -0,0 +1,193 @@
+"""Test that the GNN graph constructors work as intended."""
+
+from itertools import combinations
+
+import pytest
+
+import numpy as np
+from scipy.spatial import Delaunay
+from scipy.spatial.distance import cdist
+from scipy.sparse.csgraph import minimum_spanning_tree
+
+from spine.data import TensorBatch, IndexBatch
+from spine.utils.globals import COORD_COLS, PRINT_COL
+from spine.model.layer.gnn.graph import (
+        BipartiteGraph, KNNGraph, MSTGraph, DelaunayGraph)
+
+
+@pytest.fixture(name='batch')
+def fixture_batch():
+    """Generates a dummy batch of voxel clusters.
+
+    The batch includes entries with no cluster and with a single cluster.
+    The coordinates are random floats, such that there are no ties in the
+    inter-cluster distances.
+    """
+    # Set the random seed so that there are no surprises
+    np.random.seed(seed=0)
+
+    # Generate clusters of random sizes, with a random primary label each
+    counts = np.array([0, 1, 2, 5, 0, 8], dtype=np.int64)
+    sizes = np.random.randint(3, 10, size=np.sum(counts))
+    primaries = np.random.choice([-1., 0., 1.], size=len(sizes))
+    data = np.zeros((np.sum(sizes), PRINT_COL + 1), dtype=np.float32)
+    data[:, COORD_COLS] = 20*np.random.rand(np.sum(sizes), 3)
+    data[:, PRINT_COL] = np.repeat(primaries, sizes)
+
+    # Build the cluster index and the voxel tensor batches
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    clusts = [np.arange(offsets[i], offsets[i + 1]) for i in range(len(sizes))]
+    entry_offsets = np.concatenate(([0], np.cumsum(counts)))
+    voxel_counts = np.array([offsets[entry_offsets[b + 1]] -
+                             offsets[entry_offsets[b]]
+                             for b in range(len(counts))])
+    data = TensorBatch(data, voxel_counts)
+    clusts = IndexBatch(
+            clusts, offsets[entry_offsets[:-1]], counts, sizes)
+
+    # Compute the inter-cluster distance matrix (block-diagonal)
+    dist_mat = np.zeros((len(sizes), len(sizes)))
+    for b in range(len(counts)):
+        lo, hi = entry_offsets[b], entry_offsets[b + 1]
+        for i, j in combinations(range(lo, hi), 2):
+            dist_mat[i, j] = dist_mat[j, i] = np.min(cdist(
+                    data.tensor[clusts.index_list[i]][:, COORD_COLS],
+                    data.tensor[clusts.index_list[j]][:, COORD_COLS]))
+
+    return data, clusts, dist_mat, primaries
+
+
+def entry_nodes(counts):
+    """Returns the list of node indexes in each entry of the batch."""
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    return [np.arange(offsets[b], offsets[b + 1]) for b in range(len(counts))]
+
+
+def check_edges(result, ref_edges, counts, directed=True):
+    """Checks that the edges produced by a constructor match a reference.
+
+    Parameters
+    ----------
+    result : Tuple[np.ndarray, np.ndarray]
+        (2, E) Edge index and (B) number of edges in each entry
+    ref_edges : List[List[Tuple[int, int]]]
+        List of reference edges in each entry of the batch
+    counts : np.ndarray
+        (B) Number of nodes in each entry of the batch
+    directed : bool, default True
+        If `False`, the orientation of the edges is ignored
+    """
+    # Check the number of edges in each entry
+    edge_index, edge_counts = result
+    assert edge_index.shape == (2, np.sum(edge_counts))
+    np.testing.assert_array_equal(edge_counts, [len(e) for e in ref_edges])
+
+    # Check the edge sets in each entry, and that they stay in their entry
+    offsets = np.concatenate(([0], np.cumsum(edge_counts)))
+    node_offsets = np.concatenate(([0], np.cumsum(counts)))
+    for b, ref_edges_b in enumerate(ref_edges):
+        edges_b = edge_index[:, offsets[b]:offsets[b + 1]].T
+        assert np.all(edges_b >= node_offsets[b])
+        assert np.all(edges_b < node_offsets[b + 1])
+        if not directed:
+            edges_b = np.sort(edges_b, axis=1)
+            ref_edges_b = [tuple(sorted(e)) for e in ref_edges_b]
+
+        edges_b = [tuple(e) for e in edges_b.tolist()]
+        assert len(set(edges_b)) == len(edges_b)
+        assert set(edges_b) == set(ref_edges_b)
+
+
+@pytest.mark.parametrize('directed_to', ['secondary', 'primary'])
+def test_bipartite_graph(batch, directed_to):
+    """Tests the bipartite graph against a brute-force reference.
+
+    Any nonzero primary label, including the -1 label of nodes with an
+    unknown primary status, is considered primary.
+    """
+    # Build the graph
+    data, clusts, _, primaries = batch
+    graph = BipartiteGraph(directed=True, directed_to=directed_to)
+    result = graph.generate(data=data, clusts=clusts)
+
+    # Build the reference, check
+    ref_edges = []
+    for nodes in entry_nodes(clusts.counts):
+        edges = [(i, j) for i in nodes for j in nodes
+                 if primaries[i] != 0 and primaries[j] == 0]
+        if directed_to == 'primary':
+            edges = [(j, i) for i, j in edges]
+        ref_edges.append(edges)
+
+    check_edges(result, ref_edges, clusts.counts)
+
+
+@pytest.mark.parametrize('k', [1, 3, 10])
+def test_knn_graph(batch, k):
+    """Tests the kNN graph against a brute-force reference, including when
+    `k` exceeds the number of other nodes in an entry."""
+    # Build the graph
+    _, clusts, dist_mat, _ = batch
+    graph = KNNGraph(k=k)
+    result = graph.generate(clusts=clusts, dist_mat=dist_mat)
+
+    # Build the reference, check
+    ref_edges = []
+    for nodes in entry_nodes(clusts.counts):
+        edges = []
+        for i in nodes:
+            others = nodes[nodes != i]
+            order = np.argsort(dist_mat[i, others])
+            edges.extend((i, j) for j in others[order[:k]])
+        ref_edges.append(edges)
+
+    check_edges(result, ref_edges, clusts.counts)
+
+
+def test_mst_graph(batch):
+    """Tests the MST graph against scipy."""
+    # Build the graph
+    _, clusts, dist_mat, _ = batch
+    graph = MSTGraph()
+    result = graph.generate(clusts=clusts, dist_mat=dist_mat)
+
+    # Build the reference, check
+    ref_edges = []
+    for nodes in entry_nodes(clusts.counts):
+        edges = []
+        if len(nodes) > 1:
+            submat = dist_mat[np.ix_(nodes, nodes)]
+            mst = minimum_spanning_tree(np.triu(submat)).toarray()
+            edges = [(nodes[i], nodes[j]) for i, j in zip(*np.where(mst > 0))]
+        ref_edges.append(edges)
+
+    check_edges(result, ref_edges, clusts.counts, directed=False)
+
+
+@pytest.mark.parametrize('num_workers', [None, 1])
+def test_delaunay_graph(batch, num_workers):
+    """Tests the Delaunay graph against a brute-force reference built from
+    the voxel-level triangulation of each entry."""
+    # Build the graph
+    data, clusts, _, _ = batch
+    graph = DelaunayGraph(num_workers=num_workers)
+    result = graph.generate(data=data, clusts=clusts)
+
+    # Build the reference, check
+    ref_edges = []
+    for nodes in entry_nodes(clusts.counts):
+        edges = set()
+        if len(nodes) > 1:
+            index = np.concatenate([clusts.index_list[i] for i in nodes])
+            labels = np.repeat(
+                    nodes, [len(clusts.index_list[i]) for i in nodes])
+            points = data.tensor[index][:, COORD_COLS]
+            tri = Delaunay(points, qhull_options='QJ')
+            for simplex in tri.simplices:
+                for i, j in combinations(labels[simplex], 2):
+                    if i != j:
+                        edges.add((min(i, j), max(i, j)))
+        ref_edges.append(list(edges))
+
+    check_edges(result, ref_edges, clusts.counts)
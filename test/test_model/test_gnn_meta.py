@@ -0,0 +1,146 @@
+"""Test that the generic message passing GNN works as intended."""
+
+import io
+
+import pytest
+
+import numpy as np
+import torch
+
+from spine.data import TensorBatch
+from spine.model.layer.gnn.model.meta import MetaLayerGNN
+
+MLP_CFG = {'depth': 2, 'width': 16, 'activation': 'relu',
+           'normalization': 'batch_norm'}
+
+NODE_LAYER = {'name': 'mlp', 'message_mlp': MLP_CFG, 'aggr_mlp': MLP_CFG}
+
+EDGE_LAYER = {'name': 'mlp', 'mlp': MLP_CFG}
+
+GLOBAL_LAYER = {'name': 'mlp', 'mlp': MLP_CFG}
+
+
+def generate_graph(node_feats, edge_feats, global_feats):
+    """Generates a dummy batch of two graphs.
+
+    Parameters
+    ----------
+    node_feats : int
+        Number of node features
+    edge_feats : int
+        Number of edge features
+    global_feats : int
+        Number of global features
+
+    Returns
+    -------
+    tuple
+        Input to the forward function of :class:`MetaLayerGNN`
+    """
+    # Set the random seed so that there are no surprises
+    torch.manual_seed(0)
+
+    # Generate random features and edges within each of the two graphs
+    node_counts, edge_counts = np.array([4, 6]), np.array([10, 20])
+    x = TensorBatch(torch.randn(np.sum(node_counts), node_feats), node_counts)
+    e = TensorBatch(torch.randn(np.sum(edge_counts), edge_feats), edge_counts)
+    u = None
+    if global_feats > 0:
+        u = TensorBatch(torch.randn(2, global_feats), np.ones(2, dtype=int))
+
+    edge_index = torch.cat((torch.randint(0, 4, (2, 10)),
+                            torch.randint(4, 10, (2, 20))), dim=1)
+    batch = torch.repeat_interleave(torch.arange(2), torch.tensor(node_counts))
+
+    return x, edge_index, e, u, batch
+
+
+@pytest.mark.parametrize(
+        'edge_layer, global_feats, global_layer, fused',
+        [(EDGE_LAYER, 0, None, ['node_bn', 'edge_bn']),
+         (None, 0, None, ['node_bn']),
+         (EDGE_LAYER, 8, None, ['node_bn', 'edge_bn']),
+         (EDGE_LAYER, 8, GLOBAL_LAYER, ['node_bn', 'edge_bn', 'global_bn']),
+         (None, 8, GLOBAL_LAYER, ['node_bn', 'global_bn'])])
+def test_meta_fuse(edge_layer, global_feats, global_layer, fused):
+    """Tests that folding the input normalization layers into the first
+    linear layers does not change the output of the model in eval mode.
+
+    When there is no edge (global) update layer, the input edge (global)
+    features are consumed at every message passing step, so their
+    normalization layer is expected to be left in place.
+    """
+    # Initialize the model
+    torch.manual_seed(0)
+    model = MetaLayerGNN(
+            node_feats=16, node_layer=NODE_LAYER, edge_feats=19,
+            edge_layer=edge_layer, global_feats=global_feats,
+            global_layer=global_layer, num_mp=3)
+
+    # Run a few training iterations to populate the running statistics
+    data = generate_graph(16, 19, global_feats)
+    for _ in range(3):
+        model(*data)
+
+    # Compare the output of the model in evaluation mode before/after fusion
+    model.eval()
+    with torch.no_grad():
+        result = model(*data)
+        model.fuse()
+        result_fused = model(*data)
+
+    # Check that only the expected normalization layers were folded
+    for key in ('node_bn', 'edge_bn', 'global_bn'):
+        present = key != 'global_bn' or global_feats > 0
+        assert (getattr(model, key) is None) == (key in fused or not present)
+
+    # Check that the output is unchanged
+    assert result.keys() == result_fused.keys()
+    for key in result:
+        torch.testing.assert_close(
+                result_fused[key].tensor, result[key].tensor,
+                rtol=1e-5, atol=1e-5)
+
+
+def test_meta_fuse_train():
+    """Tests that the normalization layers cannot be fused in train mode."""
+    model = MetaLayerGNN(
+            node_feats=16, node_layer=NODE_LAYER, edge_feats=19,
+            edge_layer=EDGE_LAYER)
+    with pytest.raises(AssertionError):
+        model.fuse()
+
+
+def test_meta_compile():
+    """Tests that compiling the message passing steps does not change the
+    output of the model, and that a compiled model can still be saved."""
+    # Initialize a compiled model and a reference with the same weights
+    torch.manual_seed(0)
+    model = MetaLayerGNN(
+            node_feats=16, node_layer=NODE_LAYER, edge_feats=19,
+            edge_layer=EDGE_LAYER, torch_compile=True)
+    ref = MetaLayerGNN(
+            node_feats=16, node_layer=NODE_LAYER, edge_feats=19,
+            edge_layer=EDGE_LAYER)
+    ref.load_state_dict(model.state_dict())
+    model.eval()
+    ref.eval()
+
+    # Compare the outputs of the compiled model, before and after saving it
+    data = generate_graph(16, 19, 0)
+    with torch.no_grad():
+        result = model(*data)
+        result_ref = ref(*data)
+
+        buffer = io.BytesIO()
+        torch.save(model, buffer)
+        buffer.seek(0)
+        result_load = torch.load(buffer, weights_only=False)(*data)
+
+    for key in result_ref:
+        torch.testing.assert_close(
+                result[key].tensor, result_ref[key].tensor,
+                rtol=1e-5, atol=1e-5)
+        torch.testing.assert_close(
+                result_load[key].tensor, result_ref[key].tensor,
+                rtol=1e-5, atol=1e-5)
@@ -0,0 +1,131 @@
+"""Test that the CRT-TPC matching post-processor works as intended."""
+
+from copy import deepcopy
+from types import SimpleNamespace
+
+import pytest
+
+import numpy as np
+
+from spine.utils.globals import MUON_PID
+from spine.post.crt.crt_matching import CRTMatchProcessor
+
+# Minimal stand-in for the matcha package, which only matches each track to
+# the CRT hit with the closest time, provided it is close enough
+MATCHA_STUB = {
+    '__init__.py': '',
+    'crthit.py': (
+        "class CRTHit:\n"
+        "    def __init__(self, **kwargs):\n"
+        "        self.__dict__.update(kwargs)\n"),
+    'track.py': (
+        "class Track:\n"
+        "    def __init__(self, **kwargs):\n"
+        "        self.__dict__.update(kwargs)\n"),
+    'match_maker.py': (
+        "class MatchCandidate:\n"
+        "    def __init__(self, track, crthit):\n"
+        "        self.track, self.crthit = track, crthit\n"
+        "\n"
+        "def get_track_crthit_matches(tracks, crthits,\n"
+        "                             approach_distance_threshold, **kwargs):\n"
+        "    matches = []\n"
+        "    for track in tracks:\n"
+        "        dists = [abs(c.t1_ns - track.start_x) for c in crthits]\n"
+        "        if len(dists) and min(dists) < approach_distance_threshold:\n"
+        "            crthit = crthits[dists.index(min(dists))]\n"
+        "            matches.append(MatchCandidate(track, crthit))\n"
+        "    return matches\n")
+}
+
+
+class DummyCRTHit:
+    """Mimics the accessors of a larcv::CRTHit object."""
+
+    def __init__(self, **kwargs):
+        """Stores the value returned by each accessor."""
+        self.attrs = kwargs
+
+    def __getattr__(self, name):
+        """Returns an accessor to one of the stored values."""
+        attrs = self.__dict__.get('attrs', {})
+        if name not in attrs:
+            raise AttributeError(name)
+
+        return lambda: attrs[name]
+
+
+@pytest.fixture(name='matcha')
+def fixture_matcha(tmp_path, monkeypatch):
+    """Makes the stand-in matcha package importable, including by the
+    worker processes which inherit `sys.path`."""
+    package = tmp_path / 'matcha'
+    package.mkdir()
+    for name, content in MATCHA_STUB.items():
+        (package / name).write_text(content)
+
+    monkeypatch.syspath_prepend(str(tmp_path))
+
+
+@pytest.fixture(name='data')
+def fixture_data():
+    """Generates a batch of dummy CRT hits and interactions."""
+    # Set the random seed so that there are no surprises
+    np.random.seed(seed=0)
+
+    # Generate a few CRT hits and muon-like interactions in each entry
+    num_entries = 4
+    crthits, interactions = [], []
+    for entry in range(num_entries):
+        crthits.append([DummyCRTHit(
+                id=i, peshit=100., ts0_s=0, ts0_ns=0.,
+                ts1_ns=100*np.random.rand(), x_pos=0., y_pos=0., z_pos=0.,
+                x_err=1., y_err=1., z_err=1., plane=0, tagger='top')
+                for i in range(5)])
+
+        interactions.append([])
+        for i in range(6):
+            particle = SimpleNamespace(
+                    id=i, image_id=entry, interaction_id=i, pid=MUON_PID,
+                    is_contained=False, points=np.random.rand(10, 3),
+                    depositions=np.random.rand(10),
+                    start_point=100*np.random.rand(3),
+                    end_point=100*np.random.rand(3),
+                    start_dir=np.array([0., 0., 1.]),
+                    end_dir=np.array([0., 0., -1.]))
+            interactions[-1].append(SimpleNamespace(
+                    id=i, particles=[particle], crthit_matched=False,
+                    crthit_matched_particle_id=-1, crthit_id=-1))
+
+    return {'crthits': crthits, 'reco_interactions': interactions}
+
+
+def test_crt_match_workers(matcha, data):
+    """Tests that matching the entries of a batch in a pool of worker
+    processes produces the same matches as matching them serially."""
+    # Run the matching serially and with a pool of workers
+    results = []
+    for num_workers in (0, 2):
+        data_w = deepcopy(data)
+        processor = CRTMatchProcessor(
+                ['crthits'], num_workers=num_workers, distance_threshold=5.)
+        processor.run_batch(data_w, len(data_w['crthits']))
+        processor.close()
+
+        results.append([
+                (inter.crthit_matched, inter.crthit_matched_particle_id,
+                 inter.crthit_id)
+                for inters in data_w['reco_interactions'] for inter in inters])
+
+    # Check that some (not all) interactions are matched, the same way
+    matched = [r[0] for r in results[0]]
+    assert any(matched) and not all(matched)
+    assert results[1] == results[0]
+
+
+def test_crt_match_missing_key(data):
+    """Tests that a missing essential input is reported explicitly."""
+    processor = CRTMatchProcessor(['crthits'], num_workers=2)
+    del data['crthits']
+    with pytest.raises(AssertionError, match='crthits'):
+        processor.run_batch(data, 4)
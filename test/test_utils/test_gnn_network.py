@@ -0,0 +1,129 @@
+"""Test that the GNN graph network functions work as intended."""
+
+import pytest
+
+import numpy as np
+from numba.typed import List
+
+from spine.utils.gnn import network
+from spine.utils.gnn.network import (
+        KDTREE_MIN_PAIRS, inter_cluster_distance,
+        _inter_cluster_distance_kdtree, _get_cluster_edge_features_serial,
+        _get_cluster_edge_features_par, _get_cluster_edge_features_vec)
+
+
+@pytest.fixture(name='clusters')
+def fixture_clusters(request):
+    """Generates a batch of dummy voxel clusters.
+
+    The voxel coordinates are rounded, like real voxel coordinates, such that
+    there are many ties in the voxel pair distances.
+    """
+    # Set the random seed so that there are no surprises
+    np.random.seed(seed=0)
+
+    # Generate compact clusters of random sizes in each entry of the batch
+    counts = np.asarray(request.param, dtype=np.int64)
+    num_clusts = np.sum(counts)
+    sizes = np.random.randint(5, 120, size=num_clusts)
+    centers = 60*np.random.rand(num_clusts, 3)
+    voxels = np.vstack([np.round(c + 4*np.random.randn(s, 3))
+                        for c, s in zip(centers, sizes)]).astype(np.float32)
+
+    offsets = np.concatenate(([0], np.cumsum(sizes)))
+    clusts = [np.arange(offsets[i], offsets[i + 1]) for i in range(num_clusts)]
+
+    return voxels, clusts, counts
+
+
+@pytest.mark.parametrize('clusters', [[20, 20, 20]], indirect=True)
+@pytest.mark.parametrize('min_pairs', [1, KDTREE_MIN_PAIRS])
+def test_inter_cluster_distance_kdtree(clusters, min_pairs):
+    """Tests that the kd-tree inter-cluster distance matches the brute-force
+    search exactly, including the closest voxel pair when there are ties.
+
+    With `min_pairs` set to 1, every cluster pair is processed with a
+    kd-tree, rather than with the brute-force fallback.
+    """
+    # Compute the inter-cluster distances with both methods
+    voxels, clusts, counts = clusters
+    dist_brute, index_brute = inter_cluster_distance(
+            voxels, clusts, counts, algorithm='brute', return_index=True)
+    dist_tree, index_tree = _inter_cluster_distance_kdtree(
+            voxels, List(clusts), counts, min_pairs=min_pairs)
+
+    # Check that the outputs are identical
+    np.testing.assert_array_equal(dist_tree, dist_brute)
+    np.testing.assert_array_equal(index_tree, index_brute)
+
+
+@pytest.mark.parametrize('clusters', [[20, 20, 20], [100]], indirect=True)
+@pytest.mark.parametrize('algorithm', ['brute', 'recursive', 'kdtree'])
+@pytest.mark.parametrize('parallel', [False, True])
+def test_inter_cluster_distance_max_dist(
+        clusters, algorithm, parallel, monkeypatch):
+    """Tests that the cluster pairs within `max_dist` keep their exact
+    distances and closest voxel pairs, while the others are pruned.
+
+    The serial or parallel kernels are forced, regardless of the number of
+    cluster pairs and of the number of available threads.
+    """
+    # Force the dispatch to the serial or parallel kernels
+    monkeypatch.setattr(network, '_use_parallel', lambda _: parallel)
+
+    # Compute the inter-cluster distances with and without pruning
+    voxels, clusts, counts = clusters
+    max_dist = 10.
+    dist_mat, closest_index = inter_cluster_distance(
+            voxels, clusts, counts, algorithm=algorithm, return_index=True)
+    dist_prune, index_prune = inter_cluster_distance(
+            voxels, clusts, counts, algorithm=algorithm, return_index=True,
+            max_dist=max_dist)
+    dist_only = inter_cluster_distance(
+            voxels, clusts, counts, algorithm=algorithm, max_dist=max_dist)
+
+    # Check that there are pairs on both sides of the cut
+    close = dist_mat < max_dist
+    assert np.any(close) and np.any(~close)
+
+    # Check that the close pairs are untouched
+    np.testing.assert_array_equal(dist_prune[close], dist_mat[close])
+    np.testing.assert_array_equal(index_prune[close], closest_index[close])
+    np.testing.assert_array_equal(dist_only, dist_prune)
+
+    # Check that the far pairs are either untouched or pruned
+    pruned = np.isinf(dist_prune)
+    assert np.any(pruned)
+    assert np.all(pruned | (dist_prune == dist_mat))
+    assert np.all(index_prune[pruned] == 0)
+    assert np.all(dist_mat[pruned] >= max_dist)
+
+
+@pytest.mark.parametrize('num_edges', [10, 5000])
+def test_cluster_edge_features(num_edges):
+    """Tests that the serial, parallel and vectorized edge feature kernels
+    agree, including on zero-length edges."""
+    # Set the random seed so that there are no surprises
+    np.random.seed(seed=0)
+
+    # Generate random voxels and edges, make some of them zero-length
+    voxels = np.round(5*np.random.rand(50, 3)).astype(np.float32)
+    idxs1 = np.random.randint(0, 50, size=num_edges)
+    idxs2 = np.random.randint(0, 50, size=num_edges)
+    idxs2[:num_edges//5] = idxs1[:num_edges//5]
+
+    # Compute the features with each kernel
+    feats = _get_cluster_edge_features_serial(voxels, idxs1, idxs2)
+    feats_par = _get_cluster_edge_features_par(voxels, idxs1, idxs2)
+    feats_vec = _get_cluster_edge_features_vec(voxels, idxs1, idxs2)
+
+    # Check that the outputs agree
+    np.testing.assert_allclose(feats_par, feats, rtol=1e-6, atol=1e-6)
+    np.testing.assert_allclose(feats_vec, feats, rtol=1e-6, atol=1e-6)
+
+    # Check the features of the zero-length edges explicitly
+    zero = idxs1 == idxs2
+    assert np.any(zero) and np.all(np.isfinite(feats))
+    np.testing.assert_array_equal(feats[zero, :3], voxels[idxs1[zero]])
+    np.testing.assert_array_equal(feats[zero, 3:6], voxels[idxs1[zero]])
+    assert np.all(feats[zero, 6:] == 0.)
@@ -0,0 +1,101 @@
+"""Test that the Numba-accelerated utility functions work as intended."""
+
+import pytest
+
+import numpy as np
+from scipy.spatial.distance import cdist
+from scipy.sparse.csgraph import minimum_spanning_tree, connected_components
+
+import spine.utils.numba_local as nbl
+
+
+def scipy_mst(dist_mat):
+    """Reference minimum spanning tree edges, as provided by scipy.
+
+    Parameters
+    ----------
+    dist_mat : np.ndarray
+        (N, N) Symmetric matrix of pair-wise distances between nodes
+
+    Returns
+    -------
+    np.ndarray
+        (E, 2) List of tree edges [i, j] with i < j, sorted lexicographically
+    """
+    mst_mat = minimum_spanning_tree(np.triu(dist_mat)).toarray()
+    mst_mat = mst_mat + mst_mat.T
+
+    return np.vstack(np.where(np.triu(mst_mat) > 0.)).T
+
+
+def is_spanning_tree(edges, num_nodes):
+    """Checks that a set of edges forms a tree which spans all nodes."""
+    adj_mat = np.zeros((num_nodes, num_nodes), dtype=bool)
+    adj_mat[edges[:, 0], edges[:, 1]] = True
+    num_comps = connected_components(adj_mat, directed=False)[0]
+
+    return len(edges) == num_nodes - 1 and num_comps == 1
+
+
+@pytest.mark.parametrize('num_nodes', [0, 1, 2, 10, 50])
+def test_minimum_spanning_tree(num_nodes):
+    """Tests the MST against scipy on distinct pair-wise distances."""
+    # Set the random seed so that there are no surprises
+    np.random.seed(seed=0)
+
+    # Generate a random distance matrix, compute the MST both ways
+    points = np.random.rand(num_nodes, 3)
+    dist_mat = cdist(points, points).astype(np.float32)
+    edges = nbl.minimum_spanning_tree(dist_mat)
+    edges_ref = scipy_mst(dist_mat) if num_nodes > 1 else np.empty((0, 2))
+
+    # Check that the edges are identical, order included
+    np.testing.assert_array_equal(edges, edges_ref)
+
+
+def test_minimum_spanning_tree_ties():
+    """Tests the MST against scipy on integer distances with many ties.
+
+    When there are ties, the tree is not unique: only its total length and
+    its spanning nature are checked.
+    """
+    # Set the random seed so that there are no surprises
+    np.random.seed(seed=0)
+
+    # Generate integer distance matrices, compute the MST both ways
+    for _ in range(20):
+        num_nodes = np.random.randint(2, 30)
+        dist_mat = np.random.randint(1, 5, size=(num_nodes, num_nodes))
+        dist_mat = np.triu(dist_mat, 1).astype(np.float32)
+        dist_mat += dist_mat.T
+
+        edges = nbl.minimum_spanning_tree(dist_mat)
+        edges_ref = scipy_mst(dist_mat)
+
+        # Check that the trees are equivalent
+        assert is_spanning_tree(edges, num_nodes)
+        assert np.all(edges[:, 0] < edges[:, 1])
+        assert (np.sum(dist_mat[edges[:, 0], edges[:, 1]]) ==
+                np.sum(dist_mat[edges_ref[:, 0], edges_ref[:, 1]]))
+
+
+def test_minimum_spanning_tree_zero_length():
+    """Tests that zero-length edges can be part of the tree.
+
+    Unlike scipy, which reads zero entries as missing edges, overlapping
+    nodes are connected to each other directly.
+    """
+    # Build four points, two of which overlap
+    points = np.array([[0., 0., 0.], [0., 0., 0.],
+                       [1., 0., 0.], [3., 0., 0.]])
+    dist_mat = cdist(points, points).astype(np.float32)
+
+    # Check that the overlapping points are connected here, not in scipy
+    edges = nbl.minimum_spanning_tree(dist_mat)
+    np.testing.assert_array_equal(edges, [[0, 1], [0, 2], [2, 3]])
+    assert is_spanning_tree(edges, len(points))
+
+    edges_ref = scipy_mst(dist_mat)
+    assert [0, 1] not in edges_ref.tolist()
+    assert np.sum(dist_mat[edges[:, 0], edges[:, 1]]) == 3.
+    assert np.sum(dist_mat[edges_ref[:, 0], edges_ref[:, 1]]) == 4.